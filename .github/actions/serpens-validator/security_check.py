@@ -1,7 +1,10 @@
+import os
 import sys
 import re
-import yaml
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from dockerfile_parse import DockerfileParser
+from serpens_config import load_serpens_config, parse_memory
 
 FORBIDDEN_KEYWORDS = [
     'privileged', 'host', 'pid', 'ipc', 'cap_add',
@@ -14,46 +17,83 @@ DANGEROUS_COMMANDS = [
     r'exec\s*\(', r'subprocess', r'os\.system'
 ]
 
-FORBIDDEN_MOUNTS = [
+DANGEROUS_SOURCE_PATTERNS = [
+    (r'exec\s*\(', "exec() function - code injection risk"),
+    (r'eval\s*\(', "eval() function - code injection risk"),
+    (r'/proc/self', "proc filesystem access - potential escape"),
+    (r'pty\.spawn', "PTY spawn - potential shell escape")
+]
+
+HARDCODED_SECRET = re.compile(r'(password|secret|api_key|token)\s*=\s*["\'][^"\']+["\']', re.IGNORECASE)
+INSECURE_DOWNLOAD = re.compile(r'(curl|wget).*http[^s]')
+SUSPICIOUS_ENV = re.compile(r'(LD_PRELOAD|LD_LIBRARY_PATH)')
+
+# Scan common code files
+SOURCE_EXTENSIONS = ('.py', '.js', '.go', '.rb', '.php')
+
+# Git cannot track anything under .git; every other directory, caches and
+# vendored code included, can end up in the image, so it is still scanned
+SKIP_DIRS = frozenset({'.git'})
+
+FORBIDDEN_MOUNTS = (
     '/var/run/docker.sock', '/proc', '/sys', '/dev',
     '/etc/passwd', '/etc/shadow', '/root', '/home/claude'
-]
+)
+
+
+def compile_command_pattern(pattern):
+    """Return a casefolded substring for plain-text patterns, else a compiled regex"""
+    literal = re.sub(r'\\(.)', r'\1', pattern)
+    if re.escape(literal) == pattern:
+        return literal.casefold()
+    return re.compile(pattern, re.IGNORECASE)
+
+
+# (label, matcher) in DANGEROUS_COMMANDS order; plain-text entries skip the regex engine
+DANGEROUS_COMMAND_MATCHERS = [(p, compile_command_pattern(p)) for p in DANGEROUS_COMMANDS]
+
+# Every source pattern contains one of these literals; files without any skip the regex
+DANGEROUS_SOURCE_ANCHORS = (b'exec', b'eval', b'/proc/self', b'pty.spawn')
+
+# Matched against decoded text so \s also covers Unicode whitespace (e.g. U+00A0)
+DANGEROUS_SOURCE_RE = [(re.compile(p), desc) for p, desc in DANGEROUS_SOURCE_PATTERNS]
 
 
 def check_dockerfile(service_name):
     errors = []
 
     try:
-        with open(f'services/{service_name}/Dockerfile', 'r') as f:
-            content = f.read()
+        content = Path(f'services/{service_name}/Dockerfile').read_bytes().decode('utf-8')
 
         parser = DockerfileParser()
         parser.content = content
 
+        # Single pass: USER directives and dangerous RUN commands
         user_found = False
+        run_errors = []
         for instruction in parser.structure:
             if instruction['instruction'] == 'USER':
                 user_found = True
                 if instruction['value'].strip() in ['root', '0']:
                     errors.append("âŒ Container runs as root! Add 'USER 1000' to Dockerfile")
+            elif instruction['instruction'] == 'RUN':
+                cmd = instruction['value']
+                folded = cmd.casefold()
+                for label, matcher in DANGEROUS_COMMAND_MATCHERS:
+                    found = matcher in folded if isinstance(matcher, str) else matcher.search(cmd)
+                    if found:
+                        run_errors.append(f"âŒ Dangerous command pattern: {label}")
 
         if not user_found:
             errors.append("âŒ No USER directive! Container will run as root. Add 'USER 1000'")
-
-        # Check for dangerous RUN commands
-        for instruction in parser.structure:
-            if instruction['instruction'] == 'RUN':
-                cmd = instruction['value']
-                for pattern in DANGEROUS_COMMANDS:
-                    if re.search(pattern, cmd, re.IGNORECASE):
-                        errors.append(f"âŒ Dangerous command pattern: {pattern}")
+        errors.extend(run_errors)
 
         # Check for suspicious downloads
-        #if re.search(r'(curl|wget).*http[^s]', content):
+        #if INSECURE_DOWNLOAD.search(content):
             #errors.append("âŒ Insecure HTTP download detected. Use HTTPS only!")
 
         # Check for hardcoded secrets
-        if re.search(r'(password|secret|api_key|token)\s*=\s*["\'][^"\']+["\']', content, re.IGNORECASE):
+        if HARDCODED_SECRET.search(content):
             errors.append("âŒ Possible hardcoded secrets detected!")
 
     except Exception as e:
@@ -66,17 +106,15 @@ def check_serpens_security(service_name):
     """Check serpens.yml for security issues"""
     errors = []
 
-    with open(f'services/{service_name}/serpens.yml', 'r') as f:
-        config = yaml.safe_load(f)
+    config = load_serpens_config(service_name)
 
     # Check volumes
     if 'volumes' in config:
         for volume in config['volumes']:
             path = volume.get('path', '')
             # Check for forbidden mounts
-            for forbidden in FORBIDDEN_MOUNTS:
-                if path.startswith(forbidden):
-                    errors.append(f"âŒ Forbidden volume mount: {path}")
+            if path.startswith(FORBIDDEN_MOUNTS):
+                errors.append(f"âŒ Forbidden volume mount: {path}")
 
             # Check for parent directory access
             if '..' in path:
@@ -90,7 +128,7 @@ def check_serpens_security(service_name):
                 errors.append("âŒ Attempting to access Docker socket!")
 
             # Check for suspicious vars
-            if re.search(r'(LD_PRELOAD|LD_LIBRARY_PATH)', env):
+            if SUSPICIOUS_ENV.search(env):
                 errors.append("âŒ Suspicious environment variable!")
 
     # Check deployment settings
@@ -112,11 +150,12 @@ def check_serpens_security(service_name):
     # Resource limits
     resources = config.get('resources', {})
     mem = resources.get('memory', '128m')
-    mem_value = int(mem[:-1])
-    mem_unit = mem[-1].lower()
+    parsed_mem = parse_memory(mem)
 
     # Prevent resource abuse
-    if mem_unit == 'g' and mem_value > 1:
+    if parsed_mem is None:
+        errors.append(f"❌ Invalid memory limit: {mem} (use e.g. 128m or 1g)")
+    elif parsed_mem[1] == 'g' and parsed_mem[0] > 1:
         errors.append("âŒ Memory limit too high (max 1GB)")
 
     cpu = resources.get('cpu', 0.5)
@@ -126,34 +165,44 @@ def check_serpens_security(service_name):
     return errors
 
 
+def scan_file(filepath):
+    """Scan a single source file for dangerous patterns"""
+    errors = []
+    file = os.path.basename(filepath)
+    try:
+        with open(filepath, 'rb') as f:
+            content = f.read()
+
+        if not any(anchor in content for anchor in DANGEROUS_SOURCE_ANCHORS):
+            return errors
+
+        # Only files that hit an anchor are decoded; undecodable bytes never stop the scan
+        text = content.decode('utf-8', 'surrogateescape')
+        for pattern, desc in DANGEROUS_SOURCE_RE:
+            if pattern.search(text):
+                errors.append(f"❌ Dangerous pattern detected: {desc} in {file}")
+
+    except:
+        pass
+
+    return errors
+
+
 def scan_source_code(service_name):
     """Basic source code security scan"""
     errors = []
-    dangerous_patterns = [
-        (r'exec\s*\(', "exec() function - code injection risk"),
-        (r'eval\s*\(', "eval() function - code injection risk"),
-        (r'/proc/self', "proc filesystem access - potential escape"),
-        (r'pty\.spawn', "PTY spawn - potential shell escape")
-    ]
-
-    # Scan common code files
-    extensions = ['.py', '.js', '.go', '.rb', '.php']
-
-    import os
-    for root, _, files in os.walk(f'services/{service_name}'):
+
+    filepaths = []
+    for root, dirs, files in os.walk(f'services/{service_name}'):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
         for file in files:
-            if any(file.endswith(ext) for ext in extensions):
-                filepath = os.path.join(root, file)
-                try:
-                    with open(filepath, 'r') as f:
-                        content = f.read()
-
-                    for pattern, desc in dangerous_patterns:
-                        if re.search(pattern, content):
-                            errors.append(f"❌ Dangerous pattern detected: {desc} in {file}")
-
-                except:
-                    pass
+            if file.endswith(SOURCE_EXTENSIONS):
+                filepaths.append(os.path.join(root, file))
+
+    # File reads release the GIL, so threads overlap the I/O between files
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for file_errors in executor.map(scan_file, filepaths):
+            errors.extend(file_errors)
 
     return errors
 
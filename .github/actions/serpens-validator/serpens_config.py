@@ -0,0 +1,25 @@
+import re
+from pathlib import Path
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+MEMORY_RE = re.compile(r'(\d+)([mMgG])')
+
+
+def load_serpens_config(service_name):
+    """Load services/<service>/serpens.yml"""
+    # libyaml reads bytes directly, skipping the text-mode decode
+    return yaml.load(Path(f'services/{service_name}/serpens.yml').read_bytes(), Loader=_Loader)
+
+
+def parse_memory(memory):
+    """Split a memory string like '128m' into (value, unit); None if malformed"""
+    match = MEMORY_RE.fullmatch(str(memory))
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2).lower()
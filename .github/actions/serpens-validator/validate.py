@@ -1,8 +1,11 @@
 import sys
 import yaml
 import json
+from itertools import islice
 import requests
+from requests.adapters import HTTPAdapter
 from jsonschema import validate, ValidationError
+from serpens_config import load_serpens_config, parse_memory
 
 # Config schema
 SCHEMA = {
@@ -36,15 +39,19 @@ SCHEMA = {
     }
 }
 
+# Keep-alive session so repeated API calls reuse the TLS connection
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
 
 def check_conflicts(config):
     try:
-        response = requests.get('https://api.volodic.com/serpens/allocations')
+        response = SESSION.get('https://api.volodic.com/serpens/allocations', timeout=5)
         existing = response.json()
 
         errors = []
 
-        taken_domains = [item['domain'] for item in existing['allocations']]
+        taken_domains = {item['domain'] for item in existing['allocations']}
         if config['routing']['domain'] in taken_domains:
             errors.append(f"❌ Domain '{config['routing']['domain']}' is already taken!")
 
@@ -59,16 +66,11 @@ def check_conflicts(config):
             if available:
                 errors.append(f"   Suggestions: {', '.join(available[:3])}")
 
-        taken_ports = [item['port'] for item in existing['allocations']]
+        taken_ports = {item['port'] for item in existing['allocations']}
         if config['routing']['port'] in taken_ports:
             errors.append(f"❌ Port {config['routing']['port']} is already in use!")
 
-            free_ports = []
-            for p in range(3000, 10000):
-                if p not in taken_ports:
-                    free_ports.append(p)
-                if len(free_ports) == 3:
-                    break
+            free_ports = islice((p for p in range(3000, 10000) if p not in taken_ports), 3)
             errors.append(f"   Available ports: {', '.join(map(str, free_ports))}")
 
         return errors
@@ -78,8 +80,10 @@ def check_conflicts(config):
 
 
 def validate_memory(memory_str):
-    value = int(memory_str[:-1])
-    unit = memory_str[-1].lower()
+    parsed = parse_memory(memory_str)
+    if parsed is None:
+        return f"❌ Invalid memory format: {memory_str} (use e.g. 128m or 1g)"
+    value, unit = parsed
 
     if unit == 'g' and value > 1:
         return "❌ Memory request too high (max 1G for regular deployments), u should reuqest more"
@@ -112,10 +116,8 @@ def validate_reserved_names(service_name):
 
 
 def main(service_name):
-    config_path = f'services/{service_name}/serpens.yml'
     try:
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+        config = load_serpens_config(service_name)
     except FileNotFoundError:
         print(f"❌ Missing serpens.yml in services/{service_name}/, read README, dont be sf stupid.")
         sys.exit(1)
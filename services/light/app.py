@@ -3,14 +3,39 @@
 🎨 LED Color Controller Web App
 Enhanced with color wheel, effects, and user preferences
 """
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, g
 import requests
+from requests.adapters import HTTPAdapter
 import socket
 import logging
 import json
 import hashlib
 import os
+import copy
+import time
+import atexit
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache, wraps
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+
+try:
+    import orjson
+
+    def dumps_prefs(prefs):
+        try:
+            return orjson.dumps(prefs, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            # orjson rejects integers wider than 64 bits; the stdlib encoder does not
+            return json.dumps(prefs, indent=2).encode()
+
+    loads_prefs = orjson.loads
+except ImportError:
+    def dumps_prefs(prefs):
+        return json.dumps(prefs, indent=2).encode()
+
+    loads_prefs = json.loads
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -20,106 +45,306 @@ ESP32_IP = None
 ESP32_PORT = 80
 ESP32_KNOWN_IP = "10.42.0.232"
 DISCOVER_TIMEOUT = 2
+DISCOVER_WORKERS = 64
+LOCAL_NETWORK_BASE = None
+# Held while a discovery scan runs so callers don't start parallel sweeps
+ESP32_DISCOVERY_LOCK = threading.Lock()
+
+# Keep-alive connections to the ESP32 (urllib3 already sets TCP_NODELAY)
+ESP32_SESSION = requests.Session()
+ESP32_SESSION.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+
+# Latest pending request per key (endpoint, or 'power' for on/off), sent in order by one thread
+ESP32_PENDING = {}
+ESP32_PENDING_COND = threading.Condition()
+ESP32_SENDER = None
+ESP32_COALESCE_WINDOW = 0.025
+
+# Outbound ESP32 I/O runs here so a hung ESP32 can't pin request workers
+ESP32_EXECUTOR = ThreadPoolExecutor(max_workers=16)
+ESP32_READ_TIMEOUT = 1.5
 
 # User preferences storage
 PREFS_DIR = "user_preferences"
+# Bump when DEFAULT_PREFS gains keys so older files get merged again
+PREFS_SCHEMA = 1
+
+# Shared template; callers get a deep copy so it is never mutated
+DEFAULT_PREFS = {
+    "favorites": [
+        {"name": "Red", "r": 255, "g": 0, "b": 0},
+        {"name": "Green", "r": 0, "g": 255, "b": 0},
+        {"name": "Blue", "r": 0, "g": 0, "b": 255},
+        {"name": "White", "r": 255, "g": 255, "b": 255},
+        {"name": "Purple", "r": 128, "g": 0, "b": 128},
+        {"name": "Orange", "r": 255, "g": 165, "b": 0}
+    ],
+    "last_color": {"r": 255, "g": 255, "b": 255},
+    "last_effect": 0,
+    "brightness": 100,
+    "speed": 50,
+    "gradient_colors": [
+        {"r": 255, "g": 0, "b": 0},
+        {"r": 0, "g": 0, "b": 255}
+    ],
+    "_schema": PREFS_SCHEMA
+}
 os.makedirs(PREFS_DIR, exist_ok=True)
 
-def generate_device_id(request):
+# In-memory preferences; changes are flushed to disk once they settle.
+# Least recently used entries beyond PREFS_CACHE_SIZE are dropped once flushed.
+PREFS_CACHE = OrderedDict()
+PREFS_CACHE_SIZE = 256
+PREFS_DIRTY = {}
+PREFS_JSON = {}
+PREFS_LOCK = threading.RLock()
+PREFS_FLUSHER = None
+PREFS_FLUSH_DELAY = 0.5
+PREFS_FLUSH_INTERVAL = 0.2
+
+@lru_cache(maxsize=2048)
+def generate_device_id(user_agent, ip):
     """Generate unique device ID based on user agent, IP, etc."""
-    user_agent = request.headers.get('User-Agent', '')
-    ip = request.remote_addr or 'unknown'
-    
-    # Create hash from user agent and other factors
-    device_string = f"{user_agent}-{ip}"
-    device_id = hashlib.md5(device_string.encode()).hexdigest()[:12]
-    return device_id
+    # Hash "<user agent>-<ip>" piecewise; same digest as hashing the joined string
+    digest = hashlib.md5(usedforsecurity=False)
+    digest.update(user_agent.encode())
+    digest.update(b'-')
+    digest.update(ip.encode())
+    return digest.hexdigest()[:12]
 
-def load_user_preferences(device_id):
+def get_device_id():
+    """Device ID of the current request, computed once per request"""
+    if 'device_id' not in g:
+        g.device_id = generate_device_id(request.headers.get('User-Agent', ''),
+                                         request.remote_addr or 'unknown')
+    return g.device_id
+
+@lru_cache(maxsize=1024)
+def pref_path(device_id):
+    """Path of a device's preferences file"""
+    return os.path.join(PREFS_DIR, f"{device_id}.json")
+
+def read_user_preferences(device_id):
     """Load user preferences from file"""
-    pref_file = os.path.join(PREFS_DIR, f"{device_id}.json")
-    
-    default_prefs = {
-        "favorites": [
-            {"name": "Red", "r": 255, "g": 0, "b": 0},
-            {"name": "Green", "r": 0, "g": 255, "b": 0},
-            {"name": "Blue", "r": 0, "g": 0, "b": 255},
-            {"name": "White", "r": 255, "g": 255, "b": 255},
-            {"name": "Purple", "r": 128, "g": 0, "b": 128},
-            {"name": "Orange", "r": 255, "g": 165, "b": 0}
-        ],
-        "last_color": {"r": 255, "g": 255, "b": 255},
-        "last_effect": 0,
-        "brightness": 100,
-        "speed": 50,
-        "gradient_colors": [
-            {"r": 255, "g": 0, "b": 0},
-            {"r": 0, "g": 0, "b": 255}
-        ]
-    }
+    pref_file = pref_path(device_id)
     
     try:
         if os.path.exists(pref_file):
-            with open(pref_file, 'r') as f:
-                prefs = json.load(f)
+            with open(pref_file, 'rb') as f:
+                prefs = loads_prefs(f.read())
+                # Files written with the current schema already have every key
+                if prefs.get("_schema") == PREFS_SCHEMA:
+                    return prefs
                 # Merge with defaults to ensure all keys exist
-                for key, value in default_prefs.items():
+                for key, value in DEFAULT_PREFS.items():
                     if key not in prefs:
-                        prefs[key] = value
+                        prefs[key] = copy.deepcopy(value)
+                prefs["_schema"] = PREFS_SCHEMA
                 return prefs
     except Exception as e:
         logging.error(f"Error loading preferences: {e}")
     
-    return default_prefs
+    return copy.deepcopy(DEFAULT_PREFS)
 
-def save_user_preferences(device_id, preferences):
-    """Save user preferences to file"""
-    pref_file = os.path.join(PREFS_DIR, f"{device_id}.json")
+def write_user_preferences(device_id, data):
+    """Write serialized user preferences to file"""
+    pref_file = pref_path(device_id)
     
     try:
-        with open(pref_file, 'w') as f:
-            json.dump(preferences, f, indent=2)
+        # Write a temp file and rename it over the old one so readers never see a partial file
+        tmp_file = pref_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, pref_file)
         return True
     except Exception as e:
         logging.error(f"Error saving preferences: {e}")
         return False
 
+def trim_prefs_cache():
+    """Evict least recently used preferences that are already on disk"""
+    excess = len(PREFS_CACHE) - PREFS_CACHE_SIZE
+    if excess <= 0:
+        return
+    # Dirty entries stay until the flusher has written them
+    stale = [device_id for device_id in PREFS_CACHE if device_id not in PREFS_DIRTY][:excess]
+    for device_id in stale:
+        del PREFS_CACHE[device_id]
+        PREFS_JSON.pop(device_id, None)
+
+def load_user_preferences(device_id):
+    """Load user preferences, from memory when already cached"""
+    with PREFS_LOCK:
+        if device_id in PREFS_CACHE:
+            PREFS_CACHE.move_to_end(device_id)
+            return PREFS_CACHE[device_id]
+    
+    prefs = read_user_preferences(device_id)
+    with PREFS_LOCK:
+        prefs = PREFS_CACHE.setdefault(device_id, prefs)
+        trim_prefs_cache()
+        return prefs
+
+def save_user_preferences(device_id, preferences):
+    """Save user preferences; the flusher writes them to disk shortly after"""
+    with PREFS_LOCK:
+        PREFS_CACHE[device_id] = preferences
+        PREFS_CACHE.move_to_end(device_id)
+        PREFS_DIRTY[device_id] = time.monotonic()
+        PREFS_JSON.pop(device_id, None)
+        trim_prefs_cache()
+    start_prefs_flusher()
+    return True
+
+def user_preferences_json(device_id):
+    """User preferences serialized for the page, cached until they are saved again"""
+    # Loaded outside the lock so a cache miss doesn't hold it during the file read
+    prefs = load_user_preferences(device_id)
+    with PREFS_LOCK:
+        # Only cached devices keep their JSON, so PREFS_JSON is bounded like PREFS_CACHE;
+        # a save since the load replaced the cached dict, so this copy is not stored
+        if PREFS_CACHE.get(device_id) is not prefs:
+            return json.dumps(prefs)
+        if device_id not in PREFS_JSON:
+            PREFS_JSON[device_id] = json.dumps(prefs)
+        return PREFS_JSON[device_id]
+
+def flush_user_preferences(min_age=0.0):
+    """Write preferences that have been unchanged for min_age seconds to disk"""
+    now = time.monotonic()
+    with PREFS_LOCK:
+        due = [(device_id, changed) for device_id, changed in PREFS_DIRTY.items()
+               if now - changed >= min_age]
+        pending = {}
+        for device_id, changed in due:
+            try:
+                pending[device_id] = (changed, dumps_prefs(PREFS_CACHE[device_id]))
+            except Exception as e:
+                # Stays dirty so the change is retried rather than silently lost
+                logging.error(f"Error serializing preferences for {device_id}, will retry: {e}")
+    
+    # Entries stay dirty, and so pinned in PREFS_CACHE, until their file is on disk
+    for device_id, (changed, data) in pending.items():
+        if write_user_preferences(device_id, data):
+            with PREFS_LOCK:
+                # A save during the write bumped the timestamp; that change still needs flushing
+                if PREFS_DIRTY.get(device_id) == changed:
+                    del PREFS_DIRTY[device_id]
+
+def prefs_flusher():
+    """Background loop that coalesces bursts of preference changes into one write"""
+    while True:
+        time.sleep(PREFS_FLUSH_INTERVAL)
+        flush_user_preferences(PREFS_FLUSH_DELAY)
+
+def start_prefs_flusher():
+    """Start the flusher thread on first use (after any worker fork)"""
+    global PREFS_FLUSHER
+    with PREFS_LOCK:
+        if PREFS_FLUSHER is None:
+            PREFS_FLUSHER = threading.Thread(target=prefs_flusher, name="prefs-flusher", daemon=True)
+            PREFS_FLUSHER.start()
+
+atexit.register(flush_user_preferences)
+
+def with_prefs(fn):
+    """Pass the caller's preferences to a route and save them if it set g.prefs_dirty"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        device_id = get_device_id()
+        prefs = load_user_preferences(device_id)
+        result = fn(prefs, *args, **kwargs)
+        if g.get('prefs_dirty'):
+            save_user_preferences(device_id, prefs)
+        return result
+    return wrapper
+
+def probe_esp32(ip, timeout):
+    """Check whether an ESP32 answers at the given IP"""
+    try:
+        response = ESP32_SESSION.get(f"http://{ip}:{ESP32_PORT}/status", timeout=timeout)
+        return response.status_code == 200
+    except requests.RequestException:
+        return False
+
+def probe_first(ips, timeout=0.3):
+    """Probe IPs concurrently and return the first one an ESP32 answers on"""
+    if not ips:
+        return None
+    
+    executor = ThreadPoolExecutor(max_workers=DISCOVER_WORKERS)
+    try:
+        futures = {executor.submit(probe_esp32, ip, timeout): ip for ip in ips}
+        for future in as_completed(futures):
+            if future.result():
+                return futures[future]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return None
+
+def arp_neighbours(network_base):
+    """IPs on the local subnet that the kernel ARP cache has resolved"""
+    neighbours = []
+    try:
+        with open('/proc/net/arp') as f:
+            for line in f.read().splitlines()[1:]:
+                fields = line.split()
+                # Flags 0x0 marks an incomplete entry
+                if len(fields) >= 4 and fields[0].startswith(network_base) and fields[2] != '0x0':
+                    neighbours.append(fields[0])
+    except OSError:
+        pass
+    return neighbours
+
+def local_network_base():
+    """Prefix of the local /24, e.g. '10.42.0.', cached until rediscovery"""
+    global LOCAL_NETWORK_BASE
+    
+    if LOCAL_NETWORK_BASE is None:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            local_ip = s.getsockname()[0]
+        LOCAL_NETWORK_BASE = '.'.join(local_ip.split('.')[:-1]) + '.'
+    return LOCAL_NETWORK_BASE
+
 def find_esp32():
-    """Auto-discover ESP32 on local networks"""
+    """Auto-discover ESP32 on local networks; concurrent callers share one scan"""
+    if not ESP32_DISCOVERY_LOCK.acquire(blocking=False):
+        # A scan is already running; wait for it and use its result
+        with ESP32_DISCOVERY_LOCK:
+            return ESP32_IP is not None
+    try:
+        # Found by a scan that finished just before this one started
+        if ESP32_IP:
+            return True
+        return scan_for_esp32()
+    finally:
+        ESP32_DISCOVERY_LOCK.release()
+
+def scan_for_esp32():
+    """Probe the known IP, then the local subnet, for the ESP32"""
     global ESP32_IP
     
     # Try known IP first
-    if ESP32_KNOWN_IP:
-        try:
-            response = requests.get(f"http://{ESP32_KNOWN_IP}:{ESP32_PORT}/status", timeout=2)
-            if response.status_code == 200:
-                ESP32_IP = ESP32_KNOWN_IP
-                logging.info(f"✅ Found ESP32 at known IP: {ESP32_KNOWN_IP}")
-                return True
-        except:
-            pass
+    if ESP32_KNOWN_IP and probe_esp32(ESP32_KNOWN_IP, timeout=2):
+        ESP32_IP = ESP32_KNOWN_IP
+        logging.info(f"✅ Found ESP32 at known IP: {ESP32_KNOWN_IP}")
+        return True
     
     # Basic network scan (simplified)
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-            s.connect(("8.8.8.8", 80))
-            local_ip = s.getsockname()[0]
+        network_base = local_network_base()
         
-        network_base = '.'.join(local_ip.split('.')[:-1]) + '.'
+        # Hosts we recently talked to first, then the rest of the subnet
+        neighbours = [ip for ip in arp_neighbours(network_base) if ip != ESP32_KNOWN_IP]
+        skip = set(neighbours) | {ESP32_KNOWN_IP}
+        rest = [ip for ip in (f"{network_base}{i}" for i in range(1, 255)) if ip not in skip]
         
-        for i in range(1, 255):
-            ip = f"{network_base}{i}"
-            if ip == ESP32_KNOWN_IP:
-                continue
-                
-            try:
-                response = requests.get(f"http://{ip}:{ESP32_PORT}/status", timeout=0.3)
-                if response.status_code == 200:
-                    ESP32_IP = ip
-                    logging.info(f"✅ Found ESP32 at {ip}")
-                    return True
-            except:
-                continue
+        ip = probe_first(neighbours) or probe_first(rest)
+        if ip:
+            ESP32_IP = ip
+            logging.info(f"✅ Found ESP32 at {ip}")
+            return True
     except:
         pass
     
@@ -138,9 +363,9 @@ def send_esp32_request(endpoint, method='GET', params=None):
         url = f"http://{ESP32_IP}:{ESP32_PORT}/{endpoint}"
         
         if method == 'POST':
-            response = requests.post(url, params=params, timeout=5)
+            response = ESP32_SESSION.post(url, params=params, timeout=5)
         else:
-            response = requests.get(url, timeout=5)
+            response = ESP32_SESSION.get(url, timeout=5)
         
         if response.status_code == 200:
             try:
@@ -158,41 +383,92 @@ def send_esp32_request(endpoint, method='GET', params=None):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def send_esp32_request_async(endpoint, method='GET', params=None):
+    """Send request to ESP32 on the shared executor, returning a Future"""
+    return ESP32_EXECUTOR.submit(send_esp32_request, endpoint, method, params)
+
+def fire_esp32_request(endpoint, method='GET', params=None):
+    """Send an on/off request without waiting; the latest power change wins"""
+    # On and off share one key so they reach the ESP32 in the order they were made
+    return queue_esp32_request(endpoint, method, params, key='power')
+
+def queue_esp32_request(endpoint, method='POST', params=None, key=None):
+    """Queue a request for the sender thread; only the latest per key (default: endpoint) is sent"""
+    # Without a known ESP32 send directly so discovery errors reach the client
+    if not ESP32_IP:
+        return send_esp32_request(endpoint, method, params)
+    
+    with ESP32_PENDING_COND:
+        ESP32_PENDING[key or endpoint] = (endpoint, method, params)
+        ESP32_PENDING_COND.notify()
+    start_esp32_sender()
+    return {"success": True, "queued": True}
+
+def esp32_sender():
+    """Background loop sending the newest queued request for each key"""
+    while True:
+        with ESP32_PENDING_COND:
+            while not ESP32_PENDING:
+                ESP32_PENDING_COND.wait()
+        
+        # Let the rest of a burst (color + brightness + speed) land first
+        time.sleep(ESP32_COALESCE_WINDOW)
+        with ESP32_PENDING_COND:
+            batch = dict(ESP32_PENDING)
+            ESP32_PENDING.clear()
+        
+        for endpoint, method, params in batch.values():
+            result = send_esp32_request(endpoint, method, params)
+            if not result["success"]:
+                logging.warning(f"❌ Queued {endpoint} request failed: {result['error']}")
+
+def start_esp32_sender():
+    """Start the sender thread on first use (after any worker fork)"""
+    global ESP32_SENDER
+    with ESP32_PENDING_COND:
+        if ESP32_SENDER is None:
+            ESP32_SENDER = threading.Thread(target=esp32_sender, name="esp32-sender", daemon=True)
+            ESP32_SENDER.start()
+
+def conditional_jsonify(payload):
+    """JSON response with an ETag; answers 304 when the client already has it"""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
     """Main color controller page"""
-    device_id = generate_device_id(request)
-    preferences = load_user_preferences(device_id)
+    device_id = get_device_id()
     
     return render_template('index.html', 
                          device_id=device_id,
                          esp32_ip=ESP32_IP,
-                         preferences=json.dumps(preferences))
+                         preferences=user_preferences_json(device_id))
 
 @app.route('/api/color', methods=['POST'])
-def set_color():
+@with_prefs
+def set_color(prefs):
     """Set LED color"""
     data = request.get_json()
     
-    result = send_esp32_request('color', 'POST', {
+    result = queue_esp32_request('color', 'POST', {
         'r': data.get('r', 0),
         'g': data.get('g', 0), 
         'b': data.get('b', 0)
     })
     
     if result["success"]:
-        # Save to user preferences
-        device_id = generate_device_id(request)
-        prefs = load_user_preferences(device_id)
         prefs["last_color"] = {"r": data.get('r', 0), "g": data.get('g', 0), "b": data.get('b', 0)}
-        save_user_preferences(device_id, prefs)
+        g.prefs_dirty = True
         
         logging.info(f"🎨 Color set: RGB({data.get('r')}, {data.get('g')}, {data.get('b')})")
     
     return jsonify(result)
 
 @app.route('/api/effect', methods=['POST'])
-def set_effect():
+@with_prefs
+def set_effect(prefs):
     """Set LED effect"""
     data = request.get_json()
     effect = data.get('effect', 0)
@@ -200,56 +476,50 @@ def set_effect():
     result = send_esp32_request('effect', 'POST', {'effect': effect})
     
     if result["success"]:
-        # Save to user preferences
-        device_id = generate_device_id(request)
-        prefs = load_user_preferences(device_id)
         prefs["last_effect"] = effect
-        save_user_preferences(device_id, prefs)
+        g.prefs_dirty = True
         
         logging.info(f"🎭 Effect set: {effect}")
     
     return jsonify(result)
 
 @app.route('/api/brightness', methods=['POST'])
-def set_brightness():
+@with_prefs
+def set_brightness(prefs):
     """Set LED brightness"""
     data = request.get_json()
     brightness = data.get('brightness', 100)
     
-    result = send_esp32_request('brightness', 'POST', {'brightness': brightness})
+    result = queue_esp32_request('brightness', 'POST', {'brightness': brightness})
     
     if result["success"]:
-        # Save to user preferences
-        device_id = generate_device_id(request)
-        prefs = load_user_preferences(device_id)
         prefs["brightness"] = brightness
-        save_user_preferences(device_id, prefs)
+        g.prefs_dirty = True
         
         logging.info(f"💡 Brightness set: {brightness}%")
     
     return jsonify(result)
 
 @app.route('/api/speed', methods=['POST'])
-def set_speed():
+@with_prefs
+def set_speed(prefs):
     """Set effect speed"""
     data = request.get_json()
     speed = data.get('speed', 50)
     
-    result = send_esp32_request('speed', 'POST', {'speed': speed})
+    result = queue_esp32_request('speed', 'POST', {'speed': speed})
     
     if result["success"]:
-        # Save to user preferences
-        device_id = generate_device_id(request)
-        prefs = load_user_preferences(device_id)
         prefs["speed"] = speed
-        save_user_preferences(device_id, prefs)
+        g.prefs_dirty = True
         
         logging.info(f"⚡ Speed set: {speed}%")
     
     return jsonify(result)
 
 @app.route('/api/gradient', methods=['POST'])
-def set_gradient():
+@with_prefs
+def set_gradient(prefs):
     """Set gradient colors"""
     data = request.get_json()
     color1 = data.get('color1', {})
@@ -261,11 +531,8 @@ def set_gradient():
     })
     
     if result["success"]:
-        # Save to user preferences
-        device_id = generate_device_id(request)
-        prefs = load_user_preferences(device_id)
         prefs["gradient_colors"] = [color1, color2]
-        save_user_preferences(device_id, prefs)
+        g.prefs_dirty = True
         
         logging.info(f"🌈 Gradient set")
     
@@ -274,11 +541,11 @@ def set_gradient():
 @app.route('/api/favorites', methods=['GET', 'POST'])
 def manage_favorites():
     """Get or update favorite colors"""
-    device_id = generate_device_id(request)
+    device_id = get_device_id()
     prefs = load_user_preferences(device_id)
     
     if request.method == 'GET':
-        return jsonify({"success": True, "favorites": prefs["favorites"]})
+        return conditional_jsonify({"success": True, "favorites": prefs["favorites"]})
     
     elif request.method == 'POST':
         data = request.get_json()
@@ -311,14 +578,25 @@ def manage_favorites():
 @app.route('/api/status')
 def get_status():
     """Get LED status"""
-    result = send_esp32_request('status')
-    return jsonify(result)
+    # Without a known ESP32 wait for discovery so "ESP32 not found" reaches the client
+    if not ESP32_IP:
+        return conditional_jsonify(send_esp32_request('status'))
+    
+    future = send_esp32_request_async('status')
+    try:
+        result = future.result(timeout=ESP32_READ_TIMEOUT)
+    except FutureTimeoutError:
+        # Drop it if still queued so polls against a hung ESP32 don't pile up
+        future.cancel()
+        result = {"success": False, "error": "ESP32 timeout"}
+    return conditional_jsonify(result)
 
 @app.route('/api/discover', methods=['POST'])
 def discover_esp32():
     """Manually trigger ESP32 discovery"""
-    global ESP32_IP
+    global ESP32_IP, LOCAL_NETWORK_BASE
     ESP32_IP = None
+    LOCAL_NETWORK_BASE = None
     success = find_esp32()
     return jsonify({
         "success": success,
@@ -329,13 +607,13 @@ def discover_esp32():
 @app.route('/api/off', methods=['POST'])
 def turn_off():
     """Turn off LEDs"""
-    result = send_esp32_request('off')
+    result = fire_esp32_request('off')
     return jsonify(result)
 
 @app.route('/api/on', methods=['POST'])  
 def turn_on():
     """Turn on LEDs"""
-    result = send_esp32_request('on')
+    result = fire_esp32_request('on')
     return jsonify(result)
 
 
@@ -0,0 +1,17 @@
+# Gunicorn settings for the LED controller
+import threading
+
+bind = "0.0.0.0:5000"
+
+# One process: preferences cache, ESP32 send queue and discovered IP live
+# in memory. Threads let slow ESP32 calls overlap instead of queueing.
+workers = 1
+worker_class = "gthread"
+threads = 16
+timeout = 30
+
+
+def post_worker_init(worker):
+    """Look for the ESP32 at startup, like `python app.py`, without delaying requests"""
+    from app import find_esp32
+    threading.Thread(target=find_esp32, name="esp32-discovery", daemon=True).start()